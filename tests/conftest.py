@@ -0,0 +1,328 @@
+"""
+Shared pytest fixtures and helpers for the PDF output test suite.
+"""
+
+import contextlib
+import hashlib
+import os
+import pickle
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import pytest
+
+
+# Bump when the layout of cached values changes or an extractor whose
+# results are disk-cached (such as get_rectangles) changes what it returns
+PDF_CACHE_VERSION = 1
+
+# bill-generator always writes this file name into its output directory
+GENERATED_PDF_NAME = "invoice_output.pdf"
+
+
+def get_pdf_path():
+    """Get the path to the generated PDF."""
+    # Check environment variable first (for Docker)
+    if "PDF_PATH" in os.environ:
+        return Path(os.environ["PDF_PATH"])
+    return Path(__file__).parent.parent / "output" / GENERATED_PDF_NAME
+
+
+def generate_pdf(pdf_path):
+    """
+    Generate the PDF into pdf_path's directory.
+
+    Runs the bill-generator binary directly when it is on PATH and only
+    falls back to the Docker image (with its container start-up cost)
+    otherwise. Returns True if the generator succeeded.
+    """
+    project_dir = Path(__file__).parent.parent
+    # Both commands need an absolute directory: the binary runs from
+    # project_dir, and Docker treats a relative -v source as a volume name
+    output_dir = pdf_path.resolve().parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    binary = shutil.which("bill-generator")
+    if binary:
+        cmd = [binary]
+        env = {**os.environ, "OUTPUT_DIR": str(output_dir)}
+    else:
+        # --pull=never: only use a locally built image, never the registry
+        cmd = ["docker", "run", "--rm", "--pull=never",
+               "-v", f"{output_dir}:/app/output",
+               "bill-generator"]
+        env = None
+
+    try:
+        # Only the exit status is used, so the generator's report is
+        # discarded instead of being buffered and decoded
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=project_dir,
+            env=env
+        )
+    except OSError:
+        return False
+    return result.returncode == 0
+
+
+def ensure_pdf(pdf_path):
+    """
+    Generate the PDF if it is missing or PDF_REGENERATE=1 is set.
+
+    Returns None when pdf_path is ready to be read, otherwise a message
+    explaining why it is not.
+    """
+    if pdf_path.exists() and os.getenv("PDF_REGENERATE") != "1":
+        return None
+    if pdf_path.name != GENERATED_PDF_NAME:
+        return (
+            f"Cannot generate {pdf_path}: bill-generator only writes "
+            f"{GENERATED_PDF_NAME}. Generate the file yourself or point "
+            f"PDF_PATH at a file named {GENERATED_PDF_NAME}."
+        )
+    if not generate_pdf(pdf_path):
+        return (
+            f"Failed to generate {pdf_path}: put bill-generator on PATH "
+            f"or build the bill-generator Docker image"
+        )
+    if not pdf_path.exists():
+        return f"bill-generator succeeded but did not write {pdf_path}"
+    return None
+
+
+def pytest_sessionstart(session):
+    """
+    Under pytest-xdist, generate the PDF once in the controller before
+    any worker starts, and hand the outcome to the workers.
+    """
+    config = session.config
+    if hasattr(config, "workerinput") or not getattr(config.option, "numprocesses", None):
+        return
+    config.pdf_error = ensure_pdf(get_pdf_path())
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    """Pass the controller's generation result to each xdist worker."""
+    node.workerinput["pdf_error"] = getattr(node.config, "pdf_error", None)
+
+
+def get_rectangles(page):
+    """
+    Extract all rectangles (table cells) from the page's drawings.
+
+    Rects are (x0, y0, x1, y1) tuples so they can be cached on disk.
+    Only plain paths are needed, so clip and group entries are never
+    requested from MuPDF (extended=False).
+    """
+    if hasattr(page, "get_cdrawings"):
+        # Raw drawings carry plain float tuples instead of fitz.Rect
+        # objects, but unlike get_drawings() they are not normalized
+        raw_boxes = (
+            item[1]
+            for d in page.get_cdrawings(extended=False)
+            for item in d["items"] if item[0] == "re"
+        )
+        boxes = (
+            (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+            for x0, y0, x1, y1 in raw_boxes
+        )
+    else:
+        boxes = (
+            tuple(item[1])
+            for d in page.get_drawings(extended=False) if d.get("items")
+            for item in d["items"] if item[0] == "re"
+        )
+    return [b for b in boxes if b[2] - b[0] > 5 and b[3] - b[1] > 5]
+
+
+def _make_disk_cached(func, path):
+    """
+    Wrap func so its result is pickled to path on the first call.
+
+    Later calls, including calls from later test sessions, load the
+    pickle instead of calling func again. The result must be plain
+    Python data (tuples, dicts, str, bytes), not PyMuPDF objects.
+
+    The pickle is written to a temporary file and moved into place, so
+    concurrent pytest-xdist workers never read a partially written entry.
+    If the cache cannot be written, the result is returned uncached.
+    """
+    def cached():
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+
+        result = func()
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        except OSError:
+            # Like pytest's own cache, an unwritable cache only loses the speed-up
+            return result
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return result
+
+    return cached
+
+
+@pytest.fixture(scope="session")
+def disk_cache(request):
+    """
+    Return a cache(func, key) helper backed by .pytest_cache/pdf_fixtures.
+
+    Entries live until the key changes or `pytest --cache-clear` is run.
+    When the cache provider is disabled (-p no:cacheprovider), func is
+    simply called.
+    """
+    cache = getattr(request.config, "cache", None)
+
+    def cache_result(func, key):
+        if cache is None:
+            return func()
+        try:
+            path = cache.mkdir("pdf_fixtures") / f"{key}.pkl"
+        except OSError:
+            return func()
+        return _make_disk_cached(func, path)()
+
+    return cache_result
+
+
+@pytest.fixture(scope="session")
+def pdf_path(request):
+    """
+    Path to the generated PDF, resolved once per session.
+
+    An existing PDF is reused as-is; it is only (re)generated when it is
+    missing or PDF_REGENERATE=1 is set. xdist workers never generate it
+    themselves; the controller already did in pytest_sessionstart.
+    """
+    path = get_pdf_path()
+    workerinput = getattr(request.config, "workerinput", None)
+    if workerinput is None:
+        error = ensure_pdf(path)
+    else:
+        error = workerinput.get("pdf_error")
+        if error is None and not path.exists():
+            error = f"PDF not found at {path}"
+    if error:
+        pytest.fail(error, pytrace=False)
+    return path
+
+
+@pytest.fixture(scope="session")
+def pdf_size_and_header(pdf_path):
+    """
+    (st_size, first 5 bytes) of the PDF from a single open. The file is
+    closed before returning.
+    """
+    with pdf_path.open("rb") as f:
+        return os.fstat(f.fileno()).st_size, f.read(5)
+
+
+@pytest.fixture(scope="session")
+def pdf_bytes(pdf_path):
+    """Raw PDF file contents, read once per session."""
+    return pdf_path.read_bytes()
+
+
+@pytest.fixture(scope="session")
+def pdf_doc(pdf_bytes):
+    """
+    Load the PDF document once per session, from memory.
+
+    Every PyMuPDF-based test depends on this fixture, so they are all
+    skipped here when PyMuPDF is missing.
+    """
+    fitz = pytest.importorskip("fitz", reason="PyMuPDF not installed")
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    yield doc
+    doc.close()
+
+
+@pytest.fixture(scope="session")
+def page(pdf_doc):
+    """First (and only) page of the receipt, loaded once per session."""
+    return pdf_doc.load_page(0)
+
+
+@pytest.fixture(scope="session")
+def page_rect(page):
+    """Page rectangle, built once instead of per page.rect access."""
+    return page.rect
+
+
+@pytest.fixture(scope="session")
+def pdf_key(pdf_bytes):
+    """
+    Disk cache key: cache format version, SHA-1 of the PDF bytes and the
+    PyMuPDF version.
+    """
+    fitz = pytest.importorskip("fitz", reason="PyMuPDF not installed")
+    digest = hashlib.sha1(pdf_bytes).hexdigest()
+    return f"v{PDF_CACHE_VERSION}-{digest}-{fitz.VersionBind}"
+
+
+@pytest.fixture(scope="session")
+def page_text(request, disk_cache, pdf_key):
+    """Plain text of the page, extracted once per PDF."""
+    return disk_cache(
+        lambda: request.getfixturevalue("page").get_text(),
+        f"{pdf_key}-page_text",
+    )
+
+
+@pytest.fixture(scope="session")
+def page_text_dict(request, disk_cache, pdf_key):
+    """Structured text of the page, extracted once per PDF."""
+    return disk_cache(
+        lambda: request.getfixturevalue("page").get_text("dict"),
+        f"{pdf_key}-page_text_dict",
+    )
+
+
+@pytest.fixture(scope="session")
+def spans(page_text_dict):
+    """All text spans on the page, flattened from blocks/lines in one pass."""
+    return [
+        span
+        for block in page_text_dict["blocks"] if "lines" in block
+        for line in block["lines"]
+        for span in line["spans"]
+    ]
+
+
+@pytest.fixture(scope="session")
+def rects(request, disk_cache, pdf_key):
+    """Table cell rects from get_rectangles(), extracted once per PDF."""
+    return disk_cache(
+        lambda: get_rectangles(request.getfixturevalue("page")),
+        f"{pdf_key}-rects",
+    )
+
+
+@pytest.fixture(scope="session")
+def cells_by_y(rects):
+    """
+    Cell rects sorted top to bottom, their y0 values for bisect-based
+    row lookups, and each cell's index in drawing order.
+    """
+    order = sorted(range(len(rects)), key=lambda i: (rects[i][1], rects[i][0]))
+    cells = [rects[i] for i in order]
+    return cells, [c[1] for c in cells], order
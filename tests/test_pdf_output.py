@@ -9,23 +9,17 @@ Tests the actual PDF output to verify:
 5. Percentage values are not reversed
 """
 
-import os
-import subprocess
-import pytest
-from pathlib import Path
+import importlib.util
+import re
+from bisect import bisect_left, bisect_right
 
-# Try to import PDF libraries
-try:
-    import fitz  # PyMuPDF
-    HAS_PYMUPDF = True
-except ImportError:
-    HAS_PYMUPDF = False
+import pytest
 
-try:
-    import pdfplumber
-    HAS_PDFPLUMBER = True
-except ImportError:
-    HAS_PDFPLUMBER = False
+# Check which PDF libraries are available without importing them; each
+# is imported by the fixture that needs it, so collection and targeted
+# runs do not pay for loading MuPDF or pdfium up front
+HAS_PYMUPDF = importlib.util.find_spec("fitz") is not None
+HAS_PYPDFIUM2 = importlib.util.find_spec("pypdfium2") is not None
 
 
 # Constants from main.go - MUST MATCH THE CODE
@@ -44,199 +38,196 @@ HEADER_HEIGHT = 28.0
 TOTALS_ROW_HEIGHT = 20.0
 TOTALS_TOTAL_ROW_HEIGHT = 22.0
 
+# Arabic Unicode block; search() stops at the first Arabic character
+ARABIC_RE = re.compile('[\u0600-\u06FF]')
 
-def get_pdf_path():
-    """Get the path to the generated PDF."""
-    # Check environment variable first (for Docker)
-    if "PDF_PATH" in os.environ:
-        return Path(os.environ["PDF_PATH"])
-    return Path(__file__).parent.parent / "output" / "invoice_output.pdf"
-    return Path(__file__).parent.parent / "output" / "invoice_output.pdf"
-
-
-def generate_pdf():
-    """Generate the PDF by running the Docker container."""
-    project_dir = Path(__file__).parent.parent
-    result = subprocess.run(
-        ["docker", "run", "--rm", 
-         "-v", f"{project_dir}/output:/app/output", 
-         "bill-generator"],
-        capture_output=True,
-        text=True,
-        cwd=project_dir
-    )
-    return result.returncode == 0
+# Values that must appear in the extracted text: (value, description)
+EXPECTED_TEXT = [
+    ("INV10111", "Invoice number"),
+    ("2021/12/12", "Date"),
+    ("123456789900003", "VAT registration number"),
+    ("220", "Taxable amount"),
+    ("33", "VAT amount"),
+    ("253", "Total with VAT"),
+    ("57.5", "Product 1 total"),
+    ("80.5", "Product 2 total"),
+    ("115", "Product 3 total"),
+    # 15% must not come out reversed as 51%. A standalone "51%" check is
+    # tricky because 51 could be part of other numbers.
+    ("15%", "Percentage (not reversed)"),
+]
+
+
+def get_text_spans(spans):
+    """
+    Extract all non-blank text spans as parallel tuples.
+
+    Returns a dict of equal-length tuples ("texts", "bboxes", "sizes",
+    "is_arabic"), so a check that only needs one attribute walks a
+    single sequence instead of looking it up in one dict per span.
+    """
+    texts, bboxes, sizes = [], [], []
+    for span in spans:
+        text = span["text"].strip()
+        if text:
+            texts.append(text)
+            bboxes.append(tuple(span["bbox"]))
+            sizes.append(span["size"])
+    return {
+        "texts": tuple(texts),
+        "bboxes": tuple(bboxes),
+        "sizes": tuple(sizes),
+        "is_arabic": tuple(bool(ARABIC_RE.search(t)) for t in texts),
+    }
+
+
+def find_cell_overflows(text_spans, cells, cell_tops, cell_order, tolerance=1.0):
+    """
+    Find spans whose estimated visible bottom crosses their cell's bottom.
+    
+    text_spans comes from get_text_spans(); cells, cell_tops and
+    cell_order come from the cells_by_y fixture. Each span is matched to
+    the first cell in drawing order that contains its top-left corner,
+    so an enclosing frame drawn after the cells cannot mask an overflow;
+    spans outside every cell are ignored. tolerance is the visual
+    overflow (in points) that is still accepted.
+    
+    Returns (span_index, cell, overflow) tuples. Anything needed for a failure
+    report is derived from them only when the test actually fails.
+    """
+    violations = []
+    # A cell can only contain the text top if it starts at most this far above it
+    max_height = max((y1 - y0 for _, y0, _, y1 in cells), default=0.0)
+    
+    spans = zip(text_spans["bboxes"], text_spans["sizes"])
+    for index, ((text_x, text_y, _, _), font_size) in enumerate(spans):
+        # Estimate actual glyph bounds (not PyMuPDF's padded bbox)
+        # Text top is approximately: bbox.y0 + (bbox.height - font_size) / 2
+        # But for our purposes, we use bbox.y0 as-is for cell matching
+        
+        # Find the cell where text STARTS (using top of text box).
+        # Only cells whose top lies in [text_y - max_height, text_y] can
+        # contain it, so bisect straight to that window of rows.
+        first = bisect_left(cell_tops, text_y - max_height)
+        containing = [
+            i for i in range(first, bisect_right(cell_tops, text_y))
+            if cells[i][0] <= text_x <= cells[i][2]
+            and cells[i][1] <= text_y <= cells[i][3]
+        ]
+        if not containing:
+            continue
+        cell = cells[min(containing, key=cell_order.__getitem__)]
+        
+        # For overflow check, estimate visible glyph bottom
+        # Visible glyph is approximately font_size * 1.3 from top
+        estimated_visible_bottom = text_y + (font_size * 1.5)
+        
+        overflow = estimated_visible_bottom - cell[3]
+        if overflow > tolerance:
+            violations.append((index, cell, overflow))
+    
+    return violations
+
+
+@pytest.fixture(scope="module")
+def text_spans(spans):
+    """Non-blank spans with their Arabic flag, built once per module."""
+    return get_text_spans(spans)
+
+
+@pytest.fixture(scope="module")
+def raw_text(request, pdf_path):
+    """
+    Plain text of the page for substring checks.
+    
+    pypdfium2 (installed with pdfplumber) returns the page's text range
+    without MuPDF's block/line layout analysis. Falls back to PyMuPDF's
+    text when pypdfium2 is not available.
+    """
+    if not HAS_PYPDFIUM2:
+        return request.getfixturevalue("page_text")
+    
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        return pdf[0].get_textpage().get_text_range()
+    finally:
+        pdf.close()
+
+
+@pytest.fixture(scope="module")
+def plumber_pdf(pdf_path):
+    """Load the first page with pdfplumber, once per module."""
+    pdfplumber = pytest.importorskip("pdfplumber", reason="pdfplumber not installed")
+    with pdfplumber.open(str(pdf_path), pages=[1]) as pdf:
+        yield pdf
 
 
 class TestPDFExists:
     """Basic tests for PDF existence and validity."""
     
-    def test_pdf_file_exists(self):
+    def test_pdf_file_exists(self, pdf_path):
         """Verify the PDF file exists."""
-        pdf_path = get_pdf_path()
-        assert pdf_path.exists(), f"PDF not found at {pdf_path}"
+        assert pdf_path.is_file(), f"PDF not found at {pdf_path}"
     
-    def test_pdf_not_empty(self):
+    def test_pdf_not_empty(self, pdf_size_and_header):
         """Verify the PDF has content."""
-        pdf_path = get_pdf_path()
-        assert pdf_path.stat().st_size > 5000, "PDF file too small, likely empty or corrupted"
+        size, _ = pdf_size_and_header
+        assert size > 5000, "PDF file too small, likely empty or corrupted"
     
-    def test_pdf_header_valid(self):
+    def test_pdf_header_valid(self, pdf_size_and_header):
         """Verify the PDF has a valid header."""
-        pdf_path = get_pdf_path()
-        with open(pdf_path, 'rb') as f:
-            header = f.read(5)
+        _, header = pdf_size_and_header
         assert header == b'%PDF-', "Invalid PDF header"
 
 
-@pytest.mark.skipif(not HAS_PYMUPDF, reason="PyMuPDF not installed")
 class TestTextPositioning:
     """Tests for text positioning within cells using PyMuPDF."""
     
-    @pytest.fixture
-    def pdf_doc(self):
-        """Load the PDF document."""
-        pdf_path = get_pdf_path()
-        doc = fitz.open(str(pdf_path))
-        yield doc
-        doc.close()
-    
-    def test_page_dimensions(self, pdf_doc):
+    def test_page_dimensions(self, page_rect):
         """Verify page dimensions match expected receipt size."""
-        page = pdf_doc[0]
-        rect = page.rect
+        rect = page_rect
         # 80mm x 250mm in points (1mm = 2.83465 points)
         assert abs(rect.width - 226.77) < 1, f"Page width {rect.width} != 226.77"
         assert abs(rect.height - 708.66) < 1, f"Page height {rect.height} != 708.66"
     
-    def test_text_blocks_extracted(self, pdf_doc):
+    def test_text_blocks_extracted(self, page_text):
         """Verify text can be extracted from the PDF."""
-        page = pdf_doc[0]
-        text = page.get_text()
-        assert len(text) > 100, "Too little text extracted from PDF"
+        assert len(page_text) > 100, "Too little text extracted from PDF"
     
-    def test_arabic_text_present(self, pdf_doc):
+    def test_arabic_text_present(self, page_text):
         """Verify Arabic text is present in the PDF."""
-        page = pdf_doc[0]
-        text = page.get_text()
         # Check for Arabic Unicode range
-        has_arabic = any('\u0600' <= c <= '\u06FF' for c in text)
+        has_arabic = bool(ARABIC_RE.search(page_text))
         assert has_arabic, "No Arabic characters found in PDF"
     
-    def test_invoice_number_present(self, pdf_doc):
-        """Verify invoice number is in the PDF."""
-        page = pdf_doc[0]
-        text = page.get_text()
-        assert "INV10111" in text, "Invoice number not found"
-    
-    def test_date_present(self, pdf_doc):
-        """Verify date is in the PDF."""
-        page = pdf_doc[0]
-        text = page.get_text()
-        assert "2021/12/12" in text, "Date not found"
-    
-    def test_vat_number_present(self, pdf_doc):
-        """Verify VAT registration number is in the PDF."""
-        page = pdf_doc[0]
-        text = page.get_text()
-        assert "123456789900003" in text, "VAT registration number not found"
-    
-    def test_totals_present(self, pdf_doc):
-        """Verify all total values are present."""
-        page = pdf_doc[0]
-        text = page.get_text()
-        assert "220" in text, "Taxable amount (220) not found"
-        assert "33" in text, "VAT amount (33) not found"
-        assert "253" in text, "Total with VAT (253) not found"
-    
-    def test_product_prices_present(self, pdf_doc):
-        """Verify product prices are in the PDF."""
-        page = pdf_doc[0]
-        text = page.get_text()
-        assert "57.5" in text, "Product 1 total not found"
-        assert "80.5" in text, "Product 2 total not found"
-        assert "115" in text, "Product 3 total not found"
-    
-    def test_percentage_not_reversed(self, pdf_doc):
-        """Verify 15% is not reversed to 51%."""
-        page = pdf_doc[0]
-        text = page.get_text()
-        # Should have 15%, should NOT have 51% (unless it's part of another number)
-        assert "15%" in text, "15% not found in PDF"
-        # Check that 51% doesn't appear as a standalone percentage
-        # This is tricky because 51 could be part of other numbers
+    @pytest.mark.parametrize(
+        "value,description", EXPECTED_TEXT, ids=[v for v, _ in EXPECTED_TEXT]
+    )
+    def test_expected_text_present(self, raw_text, value, description):
+        """Verify each expected invoice value is in the PDF."""
+        assert value in raw_text, f"{description} ({value}) not found"
     
-    def test_text_within_page_bounds(self, pdf_doc):
+    def test_text_within_page_bounds(self, page_rect, spans):
         """Verify all text blocks are within page boundaries."""
-        page = pdf_doc[0]
-        page_rect = page.rect
+        page_width, page_height = page_rect.width, page_rect.height
         
-        blocks = page.get_text("dict")["blocks"]
-        for block in blocks:
-            if "lines" in block:
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        bbox = span["bbox"]
-                        # Check text is within page
-                        assert bbox[0] >= 0, f"Text extends past left edge: {bbox}"
-                        assert bbox[2] <= page_rect.width, f"Text extends past right edge: {bbox}"
-                        assert bbox[1] >= 0, f"Text extends past top edge: {bbox}"
-                        assert bbox[3] <= page_rect.height, f"Text extends past bottom edge: {bbox}"
-
-
-@pytest.mark.skipif(not HAS_PYMUPDF, reason="PyMuPDF not installed")
+        # One pass over the cached spans; report every offender at once
+        outside = [
+            bbox for bbox in (span["bbox"] for span in spans)
+            if bbox[0] < 0 or bbox[1] < 0
+            or bbox[2] > page_width or bbox[3] > page_height
+        ]
+        assert not outside, (
+            f"{len(outside)} text span(s) extend past the page edges "
+            f"(0, 0, {page_width:.2f}, {page_height:.2f}): {outside[:5]}"
+        )
+
+
 class TestTableCellBoundaries:
     """Tests specifically for text staying within table cell boundaries."""
     
-    @pytest.fixture
-    def pdf_doc(self):
-        """Load the PDF document."""
-        pdf_path = get_pdf_path()
-        doc = fitz.open(str(pdf_path))
-        yield doc
-        doc.close()
-    
-    @pytest.fixture
-    def page_data(self, pdf_doc):
-        """Extract all page data: text blocks and drawings."""
-        page = pdf_doc[0]
-        return {
-            "text_dict": page.get_text("dict"),
-            "drawings": page.get_drawings(),
-            "page_rect": page.rect
-        }
-    
-    def get_rectangles(self, page_data):
-        """Extract all rectangles (table cells) from drawings."""
-        rects = []
-        for d in page_data["drawings"]:
-            if d.get("items"):
-                for item in d["items"]:
-                    if item[0] == "re":  # rectangle
-                        rect = item[1]
-                        if hasattr(rect, 'width') and rect.width > 5 and rect.height > 5:
-                            rects.append(rect)
-        return rects
-    
-    def get_text_spans(self, page_data):
-        """Extract all text spans with bounding boxes."""
-        spans = []
-        for block in page_data["text_dict"]["blocks"]:
-            if block["type"] != 0:  # text block
-                continue
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    text = span["text"].strip()
-                    if text:
-                        spans.append({
-                            "text": text,
-                            "bbox": fitz.Rect(span["bbox"]),
-                            "size": span["size"],
-                            "is_arabic": any('\u0600' <= c <= '\u06FF' for c in text)
-                        })
-        return spans
-    
-    def test_text_within_cell_bounds(self, page_data):
+    def test_text_within_cell_bounds(self, text_spans, cells_by_y):
         """
         CRITICAL TEST: Verify text does not cross cell bottom boundaries.
         
@@ -244,149 +235,97 @@ class TestTableCellBoundaries:
         larger than the actual glyph. We check that the VISIBLE part of text
         (baseline + small descender) stays within bounds.
         """
-        rects = self.get_rectangles(page_data)
-        spans = self.get_text_spans(page_data)
-        
-        if not rects:
+        cells, cell_tops, cell_order = cells_by_y
+        if not cells:
             pytest.skip("No table rectangles found in PDF")
         
         # Debug: Print all rectangles sorted by Y
         print("\n\nDEBUG: All rectangles found:")
-        sorted_rects = sorted(rects, key=lambda r: (r.y0, r.x0))
-        for i, r in enumerate(sorted_rects[:25]):
-            print(f"  Rect {i}: y0={r.y0:.1f}, y1={r.y1:.1f}, height={r.height:.1f}, x0={r.x0:.1f}")
-        
-        violations = []
+        for i, (x0, y0, x1, y1) in enumerate(cells[:25]):
+            print(f"  Rect {i}: y0={y0:.1f}, y1={y1:.1f}, height={y1 - y0:.1f}, x0={x0:.1f}")
         
-        for span in spans:
-            text_bbox = span["bbox"]
-            font_size = span["size"]
-            
-            # Estimate actual glyph bounds (not PyMuPDF's padded bbox)
-            # Text top is approximately: bbox.y0 + (bbox.height - font_size) / 2
-            # But for our purposes, we use bbox.y0 as-is for cell matching
-            text_origin = fitz.Point(text_bbox.x0, text_bbox.y0)
-            
-            # Find the cell where text STARTS (using top of text box)
-            for cell_rect in rects:
-                if (cell_rect.x0 <= text_origin.x <= cell_rect.x1 and
-                    cell_rect.y0 <= text_origin.y <= cell_rect.y1):
-                    
-                    # For overflow check, estimate visible glyph bottom
-                    # Visible glyph is approximately font_size * 1.3 from top
-                    estimated_visible_bottom = text_bbox.y0 + (font_size * 1.5)
-                    
-                    overflow = estimated_visible_bottom - cell_rect.y1
-                    if overflow > 1.0:  # 1pt tolerance for visual overflow
-                        violations.append({
-                            "text": span["text"][:30],
-                            "text_top": text_bbox.y0,
-                            "visible_bottom": estimated_visible_bottom,
-                            "bbox_bottom": text_bbox.y1,
-                            "cell_top": cell_rect.y0,
-                            "cell_bottom": cell_rect.y1,
-                            "overflow": overflow,
-                            "is_arabic": span["is_arabic"]
-                        })
-                    break
+        violations = find_cell_overflows(text_spans, cells, cell_tops, cell_order)
         
         if violations:
             msg = f"\n{'='*60}\n"
             msg += "TEXT OVERFLOW DETECTED - Text crosses cell boundaries!\n"
             msg += f"{'='*60}\n"
-            for v in violations[:10]:
-                arabic_marker = "[ARABIC]" if v["is_arabic"] else ""
-                msg += f"  {arabic_marker} '{v['text']}'\n"
-                msg += f"     Text top: {v['text_top']:.1f}\n"
-                msg += f"     Est. visible bottom: {v['visible_bottom']:.1f}\n"
-                msg += f"     Cell: Y {v['cell_top']:.1f} to {v['cell_bottom']:.1f}\n"
-                msg += f"     OVERFLOW: {v['overflow']:.1f}pt\n\n"
+            for i, (_, cell_top, _, cell_bottom), overflow in violations[:10]:
+                text_top = text_spans["bboxes"][i][1]
+                arabic_marker = "[ARABIC]" if text_spans["is_arabic"][i] else ""
+                msg += f"  {arabic_marker} '{text_spans['texts'][i][:30]}'\n"
+                msg += f"     Text top: {text_top:.1f}\n"
+                msg += f"     Est. visible bottom: {text_top + text_spans['sizes'][i] * 1.5:.1f}\n"
+                msg += f"     Cell: Y {cell_top:.1f} to {cell_bottom:.1f}\n"
+                msg += f"     OVERFLOW: {overflow:.1f}pt\n\n"
             pytest.fail(msg)
     
-    def test_arabic_text_specifically(self, page_data):
+    def test_arabic_text_specifically(self, text_spans):
         """Test that Arabic text in particular stays within bounds."""
-        rects = self.get_rectangles(page_data)
-        spans = self.get_text_spans(page_data)
-        
-        arabic_spans = [s for s in spans if s["is_arabic"]]
-        
-        if not arabic_spans:
+        if not any(text_spans["is_arabic"]):
             pytest.skip("No Arabic text found")
         
-        for span in arabic_spans:
-            text_bbox = span["bbox"]
-            text_height = text_bbox.height
-            font_size = span["size"]
-            
-            # Arabic text height ratio should be reasonable
-            if font_size > 0:
-                height_ratio = text_height / font_size
-                # Amiri font typically has 1.2-1.5x ratio
-                assert height_ratio < 2.0, (
-                    f"Arabic text '{span['text'][:20]}' has unusual height ratio: "
-                    f"{height_ratio:.2f} (height={text_height:.1f}, size={font_size})"
-                )
-    
-    def get_table_region_text_blocks(self, pdf_doc):
-        """Extract text blocks from the table region."""
-        page = pdf_doc[0]
-        blocks = page.get_text("dict")["blocks"]
-        
-        # Table starts after header content (approximately Y=104 based on layout)
-        # This is: 10 (start) + 22 (title) + 14 (invoice#) + 14 (store) + 14 (addr) + 14 (date) + 16 (vat) = 104
-        table_start_y = 100  # approximate
-        
-        table_blocks = []
-        for block in blocks:
-            if "lines" in block:
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        bbox = span["bbox"]
-                        if bbox[1] >= table_start_y:
-                            table_blocks.append({
-                                "text": span["text"],
-                                "bbox": bbox,
-                                "y_top": bbox[1],
-                                "y_bottom": bbox[3],
-                                "height": bbox[3] - bbox[1]
-                            })
-        return table_blocks
-    
-    def test_arabic_text_height_within_row(self, pdf_doc):
+        # Arabic text height ratio should be reasonable;
+        # Amiri font typically has 1.2-1.5x ratio
+        unusual = [
+            (text, y1 - y0, size)
+            for text, (_, y0, _, y1), size, is_arabic in zip(
+                text_spans["texts"], text_spans["bboxes"],
+                text_spans["sizes"], text_spans["is_arabic"])
+            if is_arabic and size > 0 and (y1 - y0) / size >= 2.0
+        ]
+        if unusual:
+            text, text_height, font_size = unusual[0]
+            pytest.fail(
+                f"Arabic text '{text[:20]}' has unusual height ratio: "
+                f"{text_height / font_size:.2f} (height={text_height:.1f}, size={font_size})"
+            )
+    
+    # Table starts after header content (approximately Y=104 based on layout)
+    # This is: 10 (start) + 22 (title) + 14 (invoice#) + 14 (store) + 14 (addr) + 14 (date) + 16 (vat) = 104
+    TABLE_START_Y = 100  # approximate
+    
+    def test_arabic_text_height_within_row(self, text_spans):
         """
         CRITICAL TEST: Verify Arabic text doesn't exceed row height.
         
         This test checks that the text glyph height (including descenders)
         fits within the allocated row height.
         """
-        blocks = self.get_table_region_text_blocks(pdf_doc)
-        
-        for block in blocks:
-            text = block["text"]
-            height = block["height"]
-            
-            # Arabic text with font size 9 should have height <= row_height - padding
-            # Maximum expected height for size 9 Arabic font is about 14-15pt
-            max_expected_height = 16  # Allow some tolerance
-            
-            if any('\u0600' <= c <= '\u06FF' for c in text):
-                assert height <= max_expected_height, (
-                    f"Arabic text '{text}' has height {height:.1f}pt which may exceed cell bounds. "
-                    f"Expected <= {max_expected_height}pt"
-                )
+        # Arabic text with font size 9 should have height <= row_height - padding
+        # Maximum expected height for size 9 Arabic font is about 14-15pt
+        max_expected_height = 16  # Allow some tolerance
+        
+        # The Arabic flags were computed once in text_spans, so no
+        # per-block character scan is needed here
+        arabic_in_table = (
+            (text, y1 - y0)
+            for text, (_, y0, _, y1), is_arabic in zip(
+                text_spans["texts"], text_spans["bboxes"], text_spans["is_arabic"])
+            if is_arabic and y0 >= self.TABLE_START_Y
+        )
+        for text, height in arabic_in_table:
+            assert height <= max_expected_height, (
+                f"Arabic text '{text}' has height {height:.1f}pt which may exceed cell bounds. "
+                f"Expected <= {max_expected_height}pt"
+            )
     
-    def test_row_spacing_consistent(self, pdf_doc):
+    def test_row_spacing_consistent(self, spans):
         """Verify consistent spacing between table rows."""
-        blocks = self.get_table_region_text_blocks(pdf_doc)
-        
-        # Get Y positions of text blocks
-        y_positions = sorted(set(block["y_top"] for block in blocks))
+        # Y positions of text spans in the table region
+        y_positions = sorted({
+            span["bbox"][1] for span in spans
+            if span["bbox"][1] >= self.TABLE_START_Y
+        })
         
         # Check that rows are evenly spaced (approximately)
         if len(y_positions) >= 3:
-            spacings = [y_positions[i+1] - y_positions[i] for i in range(len(y_positions)-1)]
-            # Filter for table row spacings (should be around 16-20pt)
-            row_spacings = [s for s in spacings if 14 <= s <= 22]
+            # Consecutive differences, filtered for table row spacings
+            # (should be around 16-20pt), in a single pass
+            row_spacings = [
+                s for s in (b - a for a, b in zip(y_positions, y_positions[1:]))
+                if 14 <= s <= 22
+            ]
             
             if row_spacings:
                 avg_spacing = sum(row_spacings) / len(row_spacings)
@@ -397,33 +336,25 @@ class TestTableCellBoundaries:
                     )
 
 
-@pytest.mark.skipif(not HAS_PDFPLUMBER, reason="pdfplumber not installed")
 class TestWithPdfplumber:
     """Alternative tests using pdfplumber."""
     
-    @pytest.fixture
-    def pdf(self):
-        """Load PDF with pdfplumber."""
-        pdf_path = get_pdf_path()
-        with pdfplumber.open(str(pdf_path)) as pdf:
-            yield pdf
-    
-    def test_text_extraction(self, pdf):
+    def test_text_extraction(self, plumber_pdf):
         """Test basic text extraction."""
-        page = pdf.pages[0]
+        page = plumber_pdf.pages[0]
         text = page.extract_text()
         assert text is not None and len(text) > 50
     
-    def test_tables_detected(self, pdf):
+    def test_tables_detected(self, plumber_pdf):
         """Test if tables can be detected."""
-        page = pdf.pages[0]
+        page = plumber_pdf.pages[0]
         tables = page.extract_tables()
         # We should have at least the products table
         # Note: This may not work perfectly with our manually drawn tables
     
-    def test_chars_with_positions(self, pdf):
+    def test_chars_with_positions(self, plumber_pdf):
         """Test character-level extraction with positions."""
-        page = pdf.pages[0]
+        page = plumber_pdf.pages[0]
         chars = page.chars
         
         assert len(chars) > 0, "No characters extracted"
@@ -437,18 +368,10 @@ class TestWithPdfplumber:
 class TestQRCode:
     """Tests for QR code presence."""
     
-    def test_pdf_has_image(self):
+    def test_pdf_has_image(self, page):
         """Verify the PDF contains an image (QR code)."""
-        if not HAS_PYMUPDF:
-            pytest.skip("PyMuPDF not installed")
-        
-        pdf_path = get_pdf_path()
-        doc = fitz.open(str(pdf_path))
-        page = doc[0]
-        
         images = page.get_images()
         assert len(images) > 0, "No images found in PDF (QR code missing)"
-        doc.close()
 
 
 class TestLayoutMeasurements:
@@ -506,24 +429,20 @@ class TestLayoutMeasurements:
 class TestRTLRendering:
     """Tests for right-to-left text rendering."""
     
-    @pytest.mark.skipif(not HAS_PYMUPDF, reason="PyMuPDF not installed")
-    def test_arabic_words_intact(self):
+    def test_arabic_words_intact(self, raw_text):
         """Verify Arabic words are not broken or reversed incorrectly."""
-        pdf_path = get_pdf_path()
-        doc = fitz.open(str(pdf_path))
-        page = doc[0]
-        text = page.get_text()
-        doc.close()
         
         # These Arabic phrases should appear (possibly reshaped but recognizable)
         # Note: Exact matching is tricky due to reshaping
         expected_numbers = ["INV10111", "2021/12/12", "123456789900003"]
         
         for num in expected_numbers:
-            assert num in text, f"Expected '{num}' not found in PDF"
+            assert num in raw_text, f"Expected '{num}' not found in PDF"
 
 
 if __name__ == "__main__":
+    from conftest import get_pdf_path
+    
     # Run a quick check
     print("PDF Output Test Suite")
     print("=" * 50)
@@ -546,6 +465,7 @@ if __name__ == "__main__":
     
     # Check with PyMuPDF if available
     if HAS_PYMUPDF:
+        import fitz  # PyMuPDF
         doc = fitz.open(str(pdf_path))
         page = doc[0]
         text = page.get_text()
@@ -554,16 +474,7 @@ if __name__ == "__main__":
         print(f"[INFO] Text length: {len(text)} chars")
         
         # Check for key content
-        checks = [
-            ("INV10111", "Invoice number"),
-            ("2021/12/12", "Date"),
-            ("220", "Taxable amount"),
-            ("33", "VAT amount"),
-            ("253", "Total"),
-            ("15%", "Percentage (not reversed)"),
-        ]
-        
-        for value, desc in checks:
+        for value, desc in EXPECTED_TEXT:
             if value in text:
                 print(f"[PASS] {desc}: {value}")
             else: